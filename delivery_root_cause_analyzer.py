@@ -17,76 +17,424 @@ Usage: python delivery_root_cause_analyzer.py
 
 import os
 import sys
+import io
 import json
 import re
+import copy
+import hashlib
+import sqlite3
 import traceback
+import threading
+import atexit
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache, partial
+from itertools import groupby, islice
+from operator import itemgetter
 from datetime import datetime, timedelta
 from pathlib import Path
-import pandas as pd
-import numpy as np
-import dateparser
 from dotenv import load_dotenv
-import requests
 import time
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; audit entries fall back to the stdlib encoder
+    orjson = None
+
+# pandas, numpy and pyarrow are bound by load_dependencies() when the first analyzer is built,
+# and requests only when the Perplexity path is used, so importing this module stays cheap
+pd = None
+np = None
+pq = None
+
 # Load environment variables
 load_dotenv()
 
+
+def load_dependencies():
+    """Import the data stack into module globals on first use"""
+    global pd, np, pq
+    if pd is not None:
+        return
+    import pandas as pd
+    import numpy as np
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:  # Parquet cache is optional; plain CSV reads are used without it
+        pq = None
+
 # Configuration
+# Full tracebacks on errors; read once, and "DEBUG=false" in .env really means off
+DEBUG = os.getenv('DEBUG', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
 AUDIT_DIR = Path("./audit")
 AUDIT_DIR.mkdir(exist_ok=True)
 
+# Audit entries are buffered and appended to a daily JSON Lines file in batches
+AUDIT_FLUSH_ENTRIES = 32
+AUDIT_FLUSH_INTERVAL = 2.0  # seconds
+
 # Perplexity AI Configuration
 PERPLEXITY_API_KEY = os.getenv('PERPLEXITY_API_KEY')
 PERPLEXITY_BASE_URL = "https://api.perplexity.ai/chat/completions"
 PERPLEXITY_MODEL = os.getenv('PERPLEXITY_MODEL', 'sonar')
 PERPLEXITY_MAX_TOKENS = int(os.getenv('PERPLEXITY_MAX_TOKENS', '1000'))
+# The combined recommendations + summary bundle needs room for both answers and its JSON wrapper
+PERPLEXITY_BUNDLE_MAX_TOKENS = int(os.getenv('PERPLEXITY_BUNDLE_MAX_TOKENS', str(2 * PERPLEXITY_MAX_TOKENS)))
 PERPLEXITY_TEMPERATURE = float(os.getenv('PERPLEXITY_TEMPERATURE', '0.2'))
+# (connect, read) seconds. A whole reply arrives only once generation finishes, so its read timeout
+# is generous; a stream sends events continuously, so a short gap between them means it has stalled.
+# Read timeouts are never retried, which keeps the worst case at one timeout per call.
+PERPLEXITY_TIMEOUT = (3, 60)
+PERPLEXITY_STREAM_TIMEOUT = (3, 15)
+
+# Persistent cache of Perplexity responses, keyed by prompt hash and model settings
+PERPLEXITY_CACHE_FILE = AUDIT_DIR / "llm_cache.sqlite"
+PERPLEXITY_CACHE_TTL = int(os.getenv('PERPLEXITY_CACHE_TTL', '3600'))
+PERPLEXITY_CACHE_SIZE = int(os.getenv('PERPLEXITY_CACHE_SIZE', '1000'))
+
+# Integrated dataset cache, keyed by the source files and this module's modification times
+INTEGRATED_CACHE_PATTERN = "integrated_*.parquet"
+
+# Columns read by explain_delivery_causes; projecting to these keeps its slices narrow
+CAUSE_ANALYSIS_COLUMNS = ['order_id', 'is_delayed', 'status', 'primary_root_cause', 'delivery_delay_days',
+                          'amount', 'rating', 'is_critical', 'order_day_of_week', 'city', 'warehouse_name']
 
-# Data file paths
+# Maximum number of parsed queries kept per session
+QUERY_CACHE_SIZE = 512
+
+# Maximum number of memoized filter + analysis results kept per session
+ANALYSIS_CACHE_SIZE = 128
+
+# Maximum number of full query responses kept for the interactive session (least recently used evicted)
+RESPONSE_CACHE_SIZE = 64
+
+# Interactive prompt history, persisted across sessions when readline is available
+REPL_HISTORY_FILE = AUDIT_DIR / ".repl_history"
+REPL_HISTORY_LENGTH = 1000
+
+# Data files: key -> (filename, date columns parsed at read time, explicit dtypes)
+# Low-cardinality string columns are read as 'category' so merges and groupbys work on codes;
+# small numerics are downcast (amount stays float64 so revenue sums keep cent precision)
 DATA_FILES = {
-    'orders': 'orders.csv',
-    'fleet_logs': 'fleet_logs.csv',
-    'warehouse_logs': 'warehouse_logs.csv',
-    'external_factors': 'external_factors.csv',
-    'feedback': 'feedback.csv',
-    'warehouses': 'warehouses.csv',
-    'clients': 'clients.csv',
-    'drivers': 'drivers.csv'
+    'orders': ('orders.csv',
+               ['order_date', 'promised_delivery_date', 'actual_delivery_date', 'created_at'],
+               {'order_id': 'int64', 'client_id': 'int64', 'amount': 'float64',
+                'city': 'category', 'status': 'category', 'failure_reason': 'category'}),
+    'fleet_logs': ('fleet_logs.csv', [], {'order_id': 'int64', 'driver_id': 'int64'}),
+    'warehouse_logs': ('warehouse_logs.csv', [], {'order_id': 'int64'}),
+    'external_factors': ('external_factors.csv', [],
+                         {'order_id': 'int64', 'traffic_condition': 'category',
+                          'weather_condition': 'category'}),
+    'feedback': ('feedback.csv', [], {'order_id': 'int64', 'rating': 'Int8', 'sentiment': 'category'}),
+    'warehouses': ('warehouses.csv', [],
+                   {'warehouse_id': 'int64', 'capacity': 'Int32', 'city': 'category',
+                    'warehouse_name': 'category'}),
+    'clients': ('clients.csv', [], {'client_id': 'int64', 'client_name': 'category'}),
+    'drivers': ('drivers.csv', [],
+                {'driver_id': 'int64', 'partner_company': 'category', 'status': 'category'})
+}
+
+# Failure-reason patterns mapped to root causes; later entries take precedence on overlap
+ROOT_CAUSE_PATTERNS = [
+    (re.compile(r'Traffic|congestion', re.IGNORECASE), 'Traffic Congestion'),
+    (re.compile(r'Weather|disruption', re.IGNORECASE), 'Weather Disruption'),
+    (re.compile(r'Warehouse|delay', re.IGNORECASE), 'Warehouse Operations'),
+    (re.compile(r'address', re.IGNORECASE), 'Address Issues'),
+    (re.compile(r'stock', re.IGNORECASE), 'Stock Unavailability'),
+    (re.compile(r'Vehicle|breakdown', re.IGNORECASE), 'Vehicle Issues')
+]
+
+# Query/response patterns, compiled once at import
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+CLIENT_RE = re.compile(r'client\s+([a-z]+)')
+WAREHOUSE_RE = re.compile(r'warehouse\s+([a-z]+|\d+)')
+
+# Rule-based parser vocabulary; each list is matched as substrings of the lowercased query in one regex pass
+KNOWN_CITIES = ['ahmedabad', 'mumbai', 'delhi', 'bangalore', 'chennai', 'pune', 'surat', 'coimbatore', 'mysuru', 'nagpur']
+CITY_RE = re.compile('|'.join(re.escape(city) for city in KNOWN_CITIES))
+TIME_REFERENCES = ['yesterday', 'last week', 'last month', 'this month']
+TIME_REFERENCE_RE = re.compile('|'.join(re.escape(ref) for ref in TIME_REFERENCES))
+# Checked in order, the first intent whose keywords appear wins
+INTENT_PATTERNS = [
+    (re.compile(r'why|explain|reasons|causes'), 'explain_causes'),
+    (re.compile(r'compare|comparison'), 'compare'),
+    (re.compile(r'predict|forecast|expect|prepare'), 'predict'),
+    (re.compile(r'top|most|highest'), 'rank')
+]
+
+# Relative timeframes recognised in queries: phrase -> (days back for date_from, days back for date_to)
+TIMEFRAMES = {
+    'yesterday': (1, 1),
+    'last week': (7, None),
+    'last month': (30, None)
+}
+
+# Fixed severity levels so severity groupbys work on stable category codes
+SEVERITY_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+
+# Columnar copies of the CSV files, rebuilt whenever the source CSV or its DATA_FILES/USED_COLS schema changes
+PARQUET_DIR = Path("./.parquet_cache")
+
+# Explicit Arrow CSV column types for the dtypes used in DATA_FILES (categoricals are read as
+# strings and encoded afterwards so their categories come out sorted, as with pandas)
+ARROW_CSV_TYPES = {
+    'int64': 'int64', 'float64': 'float64', 'Int8': 'int8', 'Int32': 'int32', 'category': 'string'
+}
+
+# Same missing-value markers pandas.read_csv recognises, so both CSV readers agree on nulls
+CSV_NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+                   '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Columns consumed downstream for each data file; everything else is pruned at read time
+USED_COLS = {
+    'orders': ['order_id', 'client_id', 'city', 'order_date', 'promised_delivery_date',
+               'actual_delivery_date', 'status', 'amount', 'failure_reason', 'created_at'],
+    'fleet_logs': ['order_id', 'driver_id', 'vehicle_number', 'route_code', 'gps_delay_notes',
+                   'departure_time', 'arrival_time'],
+    'warehouse_logs': ['order_id', 'picking_start', 'picking_end', 'dispatch_time', 'notes'],
+    'external_factors': ['order_id', 'traffic_condition', 'weather_condition', 'event_type'],
+    'feedback': ['order_id', 'feedback_text', 'sentiment', 'rating'],
+    'warehouses': ['warehouse_id', 'warehouse_name', 'city', 'capacity', 'manager_name'],
+    'clients': ['client_id', 'client_name', 'contact_person'],
+    'drivers': ['driver_id', 'driver_name', 'partner_company', 'status']
 }
 
+def timeframe_bounds(timeframe):
+    """Resolve a TIMEFRAMES phrase to (date_from, date_to) strings relative to today"""
+    days_from, days_to = TIMEFRAMES[timeframe]
+    today = datetime.now()
+    date_from = (today - timedelta(days=days_from)).strftime('%Y-%m-%d')
+    date_to = (today - timedelta(days=days_to)).strftime('%Y-%m-%d') if days_to is not None else None
+    return date_from, date_to
+
+def json_default(obj):
+    """Encode the non-native values pandas results carry (numpy scalars, timestamps)"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, datetime) and not pd.isna(obj):
+        return obj.isoformat()
+    return str(obj)
+
+def jsonable(obj):
+    """Normalize nested dicts/lists to native JSON types, including non-string dict keys"""
+    if isinstance(obj, dict):
+        return {key if isinstance(key, str) else str(jsonable(key)): jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(item) for item in obj]
+    if isinstance(obj, (np.generic, datetime)):
+        return json_default(obj)
+    return obj
+
+def dumps_compact(obj):
+    """Serialize obj to compact single-line JSON, via orjson when it is installed"""
+    # The encoders only call json_default for values they cannot encode natively; the full
+    # jsonable() walk is reserved for payloads they reject outright (e.g. numpy dict keys)
+    if orjson is not None:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        try:
+            return orjson.dumps(obj, default=json_default, option=options).decode()
+        except TypeError:
+            return orjson.dumps(jsonable(obj), default=json_default, option=options).decode()
+    try:
+        return json.dumps(obj, default=json_default, separators=(',', ':'))
+    except TypeError:
+        return json.dumps(jsonable(obj), default=json_default, separators=(',', ':'))
+
+def cache_put(cache, key, value, max_size):
+    """Store a value in a bounded dict cache, evicting the oldest entry when full"""
+    if key not in cache and len(cache) >= max_size:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+
+def join_nonnull(df, key, col, sep=', '):
+    """Join the non-null values of `col` per `key` group into one string"""
+    return df.dropna(subset=[col]).groupby(key)[col].agg(sep.join)
+
+def category_code_mask(series, codes):
+    """Boolean mask of rows of a categorical `series` whose code is in `codes`, via a lookup table"""
+    # One slot per category plus a trailing False slot that missing values (code -1) index into
+    lookup = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+    lookup[codes] = True
+    return lookup[series.cat.codes.to_numpy()]
+
+def isin_categories(series, values):
+    """Boolean mask of `series` in `values`, comparing category codes when categorical"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.isin(values).to_numpy()
+    categories = series.cat.categories
+    codes = [categories.get_loc(value) for value in values if value in categories]
+    return category_code_mask(series, codes)
+
+def contains_categories(series, pattern):
+    """Case-insensitive regex match of `series`, evaluated once per category when categorical"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.str.contains(pattern, case=False, na=False).to_numpy()
+    matching = series.cat.categories.str.contains(pattern, case=False, regex=True)
+    return category_code_mask(series, np.flatnonzero(matching))
+
 class DeliveryAnalyzer:
     """Main class for delivery analytics and root cause analysis"""
     
     def __init__(self):
+        load_dependencies()
         self.data = {}
         self.integrated_df = None
+        # Parsed queries keyed by normalized query text (session lifetime)
+        self._query_cache = {}
+        # Filter + analysis results keyed by canonical filters, cleared when the dataset is rebuilt
+        self._analysis_cache = {}
+        # Full responses keyed by (query, day) for repeated interactive queries
+        self._response_cache = {}
+        # Order-date masks keyed by (date_from, date_to), cleared when the dataset is rebuilt
+        self._date_masks = {}
+        # Guards the four caches above when queries run on worker threads; held only around
+        # lookups and inserts, never while a result is being computed
+        self._cache_lock = threading.Lock()
+        # Perplexity responses already seen this session as (created_at, content), in front of
+        # the SQLite cache and bounded/expired like it; the lock covers pooled worker threads
+        self._ai_cache = {}
+        self._ai_cache_lock = threading.Lock()
+        # Recommendations + executive summary from the combined AI call, keyed by id() of the
+        # results they describe so concurrent queries do not overwrite each other's bundle
+        self._ai_bundles = {}
+        # Buffered audit log, flushed in batches and at exit into the file for each entry's day,
+        # opened unbuffered so each flush reaches the OS as a single append
+        self._audit_fh = None
+        self._audit_day = None
+        self._audit_buf = []  # (day, serialized entry)
+        self._audit_lock = threading.RLock()
+        self._audit_last_flush = time.monotonic()
+        atexit.register(self.flush_audit_log)
         # Perplexity integration flag
         self.use_perplexity = bool(PERPLEXITY_API_KEY)
+        # Stream the executive summary to the terminal as it is generated (enabled by the interactive CLI)
+        self.stream_summaries = False
+        # Pooled HTTP session so Perplexity calls reuse the TLS connection; built once up front
+        # (requests is only imported when the integration is enabled) so pooled worker
+        # threads never race to create their own
+        self._http = self.create_http_session() if self.use_perplexity else None
+        self._http_lock = threading.Lock()
         if self.use_perplexity:
             print("🤖 Perplexity AI integration enabled")
         else:
             print("📋 Using rule-based NLP (Perplexity disabled)")
-        self.load_all_data()
-        self.create_integrated_dataset()
+        # The integrated cache is keyed on the source files' mtimes, so a hit needs none of them read
+        if not self.load_integrated_cache():
+            self.load_all_data()
+            self.create_integrated_dataset()
+        # Warm the date masks for the relative timeframes most queries use
+        for timeframe in TIMEFRAMES:
+            self.date_mask(*timeframe_bounds(timeframe))
     
     def load_all_data(self):
-        """Load all CSV files into memory"""
+        """Load all data files into memory, reading them in parallel"""
         print("Loading data files...")
-        for key, filename in DATA_FILES.items():
-            filepath = Path(filename)
-            if filepath.exists():
+        # File parsing happens in C code that releases the GIL, so threads overlap the reads
+        with ThreadPoolExecutor(max_workers=min(8, len(DATA_FILES))) as executor:
+            futures = {}
+            for key, (filename, _, _) in DATA_FILES.items():
+                filepath = Path(filename)
+                if filepath.exists():
+                    futures[key] = executor.submit(self.read_data_file, key, filepath)
+                else:
+                    print(f"✗ File not found: {filename}")
+            
+            for key, future in futures.items():
+                filename = DATA_FILES[key][0]
                 try:
-                    self.data[key] = pd.read_csv(filepath)
+                    self.data[key] = future.result()
                     print(f"✓ Loaded {filename}: {len(self.data[key])} records")
                 except Exception as e:
                     print(f"✗ Error loading {filename}: {e}")
-            else:
-                print(f"✗ File not found: {filename}")
+    
+    def read_data_file(self, key, filepath):
+        """Read only the used columns of a data file, preferring its Parquet copy"""
+        columns = USED_COLS.get(key)
+        _, date_cols, dtype_map = DATA_FILES[key]
+        
+        if pq is not None:
+            parquet_path = self.parquet_copy_path(key, filepath)
+            try:
+                if not parquet_path.exists() or parquet_path.stat().st_mtime < filepath.stat().st_mtime:
+                    self.convert_to_parquet(filepath, parquet_path, date_cols, dtype_map, columns)
+                return pq.read_table(parquet_path, columns=columns).to_pandas()
+            except Exception as e:
+                print(f"⚠️ Parquet cache unavailable for {filepath.name}, reading CSV: {e}")
+        
+        # Fallback to CSV with the same column pruning
+        return pd.read_csv(filepath, usecols=columns, parse_dates=date_cols, dtype=dtype_map)
+    
+    def parquet_copy_path(self, key, filepath):
+        """Parquet copy of a data file, named by the schema it was written with; copies from
+        other schemas are removed"""
+        _, date_cols, dtype_map = DATA_FILES[key]
+        schema = repr((sorted(date_cols), sorted(dtype_map.items()), USED_COLS.get(key)))
+        fingerprint = hashlib.blake2b(schema.encode(), digest_size=8).hexdigest()
+        parquet_path = PARQUET_DIR / f"{filepath.stem}_{fingerprint}.parquet"
+        
+        for stale in PARQUET_DIR.glob(f"{filepath.stem}_*.parquet"):
+            if stale != parquet_path:
+                stale.unlink(missing_ok=True)
+        # Copies from before the schema was part of the name
+        (PARQUET_DIR / f"{filepath.stem}.parquet").unlink(missing_ok=True)
+        return parquet_path
+    
+    def convert_to_parquet(self, filepath, parquet_path, date_cols, dtype_map, used_cols=None):
+        """One-time conversion of a CSV file into its Parquet copy (dates stored as timestamps)"""
+        PARQUET_DIR.mkdir(exist_ok=True)
+        try:
+            df = self.read_csv_arrow(filepath, date_cols, dtype_map, used_cols)
+        except Exception as e:
+            print(f"⚠️ Arrow CSV reader failed for {filepath.name}, using pandas: {e}")
+            df = pd.read_csv(filepath, parse_dates=date_cols, dtype=dtype_map)
+        df.to_parquet(parquet_path, compression='snappy', index=False)
+    
+    def read_csv_arrow(self, filepath, date_cols, dtype_map, used_cols=None):
+        """Parse a CSV file with Arrow's multithreaded reader into the same frame pandas.read_csv gives"""
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        
+        # Declared dtypes and dates are typed explicitly; other used columns stay strings, since
+        # Arrow would otherwise infer timestamps for text columns such as departure_time
+        column_types = {col: pa.string() for col in used_cols or []}
+        column_types.update({col: pa.timestamp('us') for col in date_cols})
+        column_types.update({col: pa.type_for_alias(ARROW_CSV_TYPES[dtype]) for col, dtype in dtype_map.items()})
+        
+        table = pacsv.read_csv(
+            filepath,
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),  # addresses contain quoted newlines
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                null_values=CSV_NULL_VALUES,
+                strings_can_be_null=True
+            )
+        )
+        return table.to_pandas().astype(dtype_map)
+    
+    def load_integrated_cache(self):
+        """Load the integrated dataset from its cache if the sources are unchanged; return whether it was"""
+        cache_path = self.integrated_cache_path()
+        if cache_path is None or not cache_path.exists():
+            return False
+        
+        try:
+            integrated_df = pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"⚠️ Integrated dataset cache unreadable, rebuilding: {e}")
+            return False
+        
+        self.clear_analysis_cache()
+        self.integrated_df = integrated_df
+        print(f"✓ Integrated dataset loaded from cache: {len(self.integrated_df)} records "
+              f"with {len(self.integrated_df.columns)} features")
+        return True
     
     def create_integrated_dataset(self):
         """Create an integrated dataset by joining all relevant data"""
         print("\nCreating integrated dataset...")
+        self.clear_analysis_cache()
         
         if 'orders' not in self.data:
             raise ValueError("Orders data is required as the primary dataset")
@@ -95,17 +443,16 @@ class DeliveryAnalyzer:
         df = self.data['orders'].copy()
         print(f"Base orders columns: {list(df.columns)}")
         
-        # Parse dates
-        date_columns = ['order_date', 'promised_delivery_date', 'actual_delivery_date', 'created_at']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-        
         # Add warehouse information
         if 'warehouses' in self.data:
-            # Create warehouse mapping based on city for simplicity
-            warehouse_mapping = self.data['warehouses'].groupby('city')['warehouse_id'].first().to_dict()
-            df['warehouse_id'] = df['city'].map(warehouse_mapping)
+            # Create warehouse mapping based on city for simplicity: one lookup per city
+            # category, gathered per row by code (the trailing NA serves code -1)
+            city_warehouse = self.data['warehouses'].drop_duplicates('city').set_index('city')['warehouse_id']
+            cities = df['city'].astype('category')
+            warehouse_lookup = pd.array(
+                list(city_warehouse.reindex(cities.cat.categories)) + [pd.NA], dtype='Int64'
+            )
+            df['warehouse_id'] = warehouse_lookup[cities.cat.codes.to_numpy()]
             df = df.merge(
                 self.data['warehouses'][['warehouse_id', 'warehouse_name', 'capacity', 'manager_name']],
                 on='warehouse_id', how='left'
@@ -118,62 +465,104 @@ class DeliveryAnalyzer:
                 on='client_id', how='left'
             )
         
+        # Order-level details are built on the small per-order summaries and joined
+        # to the orders in a single merge, instead of merging each one into the wide frame
+        order_details = []
+        
         # Add fleet logs information
         if 'fleet_logs' in self.data:
-            fleet_summary = self.data['fleet_logs'].groupby('order_id').agg({
+            fleet_logs = self.data['fleet_logs']
+            fleet_summary = fleet_logs.groupby('order_id').agg({
                 'driver_id': 'first',
                 'vehicle_number': 'first',
                 'route_code': 'first',
-                'gps_delay_notes': lambda x: ', '.join(filter(lambda y: y and pd.notna(y), x)) if any(pd.notna(x)) else None,
                 'departure_time': 'first',
                 'arrival_time': 'first'
-            }).reset_index()
+            }).join(join_nonnull(fleet_logs, 'order_id', 'gps_delay_notes'))
             
-            df = df.merge(fleet_summary, on='order_id', how='left')
-        
-        # Add driver information
-        if 'drivers' in self.data and 'driver_id' in df.columns:
-            df = df.merge(
-                self.data['drivers'][['driver_id', 'driver_name', 'partner_company', 'status']],
-                on='driver_id', how='left'
-            )
+            # Add driver information
+            if 'drivers' in self.data:
+                fleet_summary = fleet_summary.reset_index().merge(
+                    self.data['drivers'][['driver_id', 'driver_name', 'partner_company', 'status']],
+                    on='driver_id', how='left'
+                ).set_index('order_id')
+            
+            order_details.append(fleet_summary)
         
         # Add warehouse logs
         if 'warehouse_logs' in self.data:
-            warehouse_summary = self.data['warehouse_logs'].groupby('order_id').agg({
+            warehouse_logs = self.data['warehouse_logs']
+            warehouse_summary = warehouse_logs.groupby('order_id').agg({
                 'picking_start': 'first',
                 'picking_end': 'first',
-                'dispatch_time': 'first',
-                'notes': lambda x: ', '.join(filter(lambda y: y and pd.notna(y), x)) if any(pd.notna(x)) else None
-            }).reset_index()
+                'dispatch_time': 'first'
+            }).join(join_nonnull(warehouse_logs, 'order_id', 'notes'))
             
-            df = df.merge(warehouse_summary, on='order_id', how='left', suffixes=('', '_warehouse'))
+            order_details.append(warehouse_summary)
         
         # Add external factors
         if 'external_factors' in self.data:
-            external_summary = self.data['external_factors'].groupby('order_id').agg({
+            external_factors = self.data['external_factors']
+            external_summary = external_factors.groupby('order_id').agg({
                 'traffic_condition': 'first',
-                'weather_condition': 'first',
-                'event_type': lambda x: ', '.join(filter(lambda y: y and pd.notna(y), x)) if any(pd.notna(x)) else None
-            }).reset_index()
+                'weather_condition': 'first'
+            }).join(join_nonnull(external_factors, 'order_id', 'event_type'))
             
-            df = df.merge(external_summary, on='order_id', how='left')
+            order_details.append(external_summary)
         
         # Add customer feedback
         if 'feedback' in self.data:
             feedback_summary = self.data['feedback'].groupby('order_id').agg({
-                'feedback_text': lambda x: ' | '.join(x),
+                'feedback_text': ' | '.join,
                 'sentiment': 'first',
                 'rating': 'mean'
-            }).reset_index()
+            }).astype({'rating': 'float64'})  # plain float mean of the Int8 ratings
             
-            df = df.merge(feedback_summary, on='order_id', how='left')
+            order_details.append(feedback_summary)
+        
+        if order_details:
+            details = pd.concat(order_details, axis=1, join='outer')
+            df = df.merge(details, left_on='order_id', right_index=True, how='left')
+        
+        # Lowercased city for case-insensitive filtering without per-query string work
+        df['city_lc'] = df['city'].str.lower().astype('category')
         
         # Create derived features for root cause analysis
         self.add_root_cause_features(df)
         
         self.integrated_df = df
         print(f"✓ Integrated dataset created: {len(df)} records with {len(df.columns)} features")
+        
+        # A file that exists but failed to load leaves the fingerprint unchanged, so a dataset
+        # built without it must not be cached
+        cache_path = self.integrated_cache_path()
+        failed = [filename for key, (filename, _, _) in DATA_FILES.items()
+                  if key not in self.data and Path(filename).exists()]
+        if failed:
+            print(f"⚠️ Not caching integrated dataset, these files failed to load: {', '.join(failed)}")
+        elif cache_path is not None:
+            try:
+                df.to_parquet(cache_path, compression='zstd', index=False)
+            except Exception as e:
+                print(f"⚠️ Failed to cache integrated dataset: {e}")
+    
+    def integrated_cache_path(self):
+        """Cache file for the integrated dataset, removing caches built from older inputs"""
+        if pq is None:
+            return None
+        
+        # Source files plus this module, so data or feature-logic changes invalidate the cache
+        sources = [Path(filename) for filename, _, _ in DATA_FILES.values()] + [Path(__file__)]
+        fingerprint = '|'.join(
+            f"{path}:{path.stat().st_mtime_ns}" if path.exists() else f"{path}:missing" for path in sources
+        )
+        key = hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+        cache_path = AUDIT_DIR / INTEGRATED_CACHE_PATTERN.replace('*', key)
+        
+        for stale in AUDIT_DIR.glob(INTEGRATED_CACHE_PATTERN):
+            if stale != cache_path:
+                stale.unlink(missing_ok=True)
+        return cache_path
     
     def add_root_cause_features(self, df):
         """Add derived features for root cause analysis"""
@@ -181,54 +570,98 @@ class DeliveryAnalyzer:
         # Calculate delivery delay in days
         df['delivery_delay_days'] = (
             (df['actual_delivery_date'] - df['promised_delivery_date']).dt.days
-        ).fillna(0)
+        ).fillna(0).astype('int16')
         
         # Ensure status column exists (check if it was dropped during merges)
         if 'status' not in df.columns:
             print("Warning: 'status' column missing after merges")
-            df['status'] = 'Unknown'
+            df['status'] = pd.Categorical.from_codes(np.zeros(len(df), dtype=int), categories=['Unknown'])
         
         # Determine if order was delayed
-        df['is_delayed'] = (df['delivery_delay_days'] > 0) | (df['status'].isin(['Failed', 'Returned', 'Pending']))
+        df['is_delayed'] = (df['delivery_delay_days'] > 0).to_numpy() | isin_categories(df['status'], ['Failed', 'Returned', 'Pending'])
         
         # Infer primary root causes based on failure_reason (simpler approach)
-        df['primary_root_cause'] = 'Other/Unknown'
+        primary_root_cause = np.full(len(df), 'Other/Unknown', dtype=object)
         
         if 'failure_reason' in df.columns:
-            # Map failure reasons to root causes
-            df.loc[df['failure_reason'].str.contains('Traffic|congestion', case=False, na=False), 'primary_root_cause'] = 'Traffic Congestion'
-            df.loc[df['failure_reason'].str.contains('Weather|disruption', case=False, na=False), 'primary_root_cause'] = 'Weather Disruption'
-            df.loc[df['failure_reason'].str.contains('Warehouse|delay', case=False, na=False), 'primary_root_cause'] = 'Warehouse Operations'
-            df.loc[df['failure_reason'].str.contains('address|Address', case=False, na=False), 'primary_root_cause'] = 'Address Issues'
-            df.loc[df['failure_reason'].str.contains('Stock|stock', case=False, na=False), 'primary_root_cause'] = 'Stock Unavailability'
-            df.loc[df['failure_reason'].str.contains('Vehicle|breakdown', case=False, na=False), 'primary_root_cause'] = 'Vehicle Issues'
+            # Classify each distinct failure reason once, then gather per row by category code
+            reasons = df['failure_reason'].astype('category')
+            reason_values = reasons.cat.categories.to_series()
+            conditions = [reason_values.str.contains(pattern).to_numpy() for pattern, _ in reversed(ROOT_CAUSE_PATTERNS)]
+            causes = [cause for _, cause in reversed(ROOT_CAUSE_PATTERNS)]
+            reason_causes = np.append(np.select(conditions, causes, default='Other/Unknown'), 'Other/Unknown').astype(object)
+            primary_root_cause = reason_causes[reasons.cat.codes.to_numpy()]  # code -1 (missing) -> 'Other/Unknown'
         
         # For failed orders without specific failure reasons, use status
-        df.loc[df['status'] == 'Failed', 'primary_root_cause'] = df.loc[df['status'] == 'Failed', 'failure_reason'].fillna('Unknown Failure')
-        df.loc[df['status'] == 'Returned', 'primary_root_cause'] = 'Customer Return'
-        df.loc[df['status'] == 'Pending', 'primary_root_cause'] = 'Processing Delay'
-        
-        # Add severity classification
-        df['severity'] = 'Low'
-        df.loc[df['delivery_delay_days'] > 2, 'severity'] = 'Medium'
-        df.loc[df['delivery_delay_days'] > 5, 'severity'] = 'High'
-        df.loc[df['status'] == 'Failed', 'severity'] = 'Critical'
+        status = df['status']
+        df['primary_root_cause'] = pd.Categorical(np.select(
+            [(status == 'Failed').to_numpy(), (status == 'Returned').to_numpy(), (status == 'Pending').to_numpy()],
+            [df['failure_reason'].astype(object).fillna('Unknown Failure').to_numpy(), 'Customer Return', 'Processing Delay'],
+            default=primary_root_cause
+        ))
+        
+        # Add severity classification: bucket by delay, failed orders are always critical
+        severity = pd.cut(df['delivery_delay_days'], bins=[-np.inf, 2, 5, np.inf], labels=SEVERITY_LEVELS[:3])
+        severity = severity.cat.set_categories(SEVERITY_LEVELS, ordered=True)
+        df['severity'] = severity.where(df['status'] != 'Failed', 'Critical')
+        df['is_critical'] = (df['severity'] == 'Critical').astype('int8')
         
         # Add time-based features
         df['order_hour'] = df['order_date'].dt.hour
-        df['order_day_of_week'] = df['order_date'].dt.day_name()
-        df['order_month'] = df['order_date'].dt.month_name()
+        df['order_day_of_week'] = df['order_date'].dt.day_name().astype('category')
+        df['order_month'] = df['order_date'].dt.month_name().astype('category')
     
-    def call_perplexity_api(self, prompt, max_retries=3):
-        """Make API call to Perplexity with error handling and retries"""
+    def create_http_session(self):
+        """Create a keep-alive HTTP session that retries connect failures, rate limits and server errors with backoff"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        retry = Retry(
+            total=3,
+            read=0,  # a POST that timed out may still be generating; resending it only doubles the wait
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['POST']),
+            raise_on_status=False
+        )
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+        session.headers.update({
+            "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive"
+        })
+        return session
+    
+    def call_perplexity_api(self, prompt, stream=False, max_tokens=PERPLEXITY_MAX_TOKENS):
+        """Make API call to Perplexity with error handling (retries are handled by the session)
+        
+        With stream=True the response is requested as server-sent events and echoed to stdout
+        as it arrives; the full text is still returned and cached.
+        """
         
         if not self.use_perplexity:
             return None
-            
-        headers = {
-            "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        
+        import requests
+        
+        cache_key = self.perplexity_cache_key(prompt, max_tokens)
+        with self._ai_cache_lock:
+            entry = self._ai_cache.get(cache_key)
+            if entry is not None and entry[0] <= time.time() - PERPLEXITY_CACHE_TTL:
+                del self._ai_cache[cache_key]
+                entry = None
+        if entry is None:
+            entry = self.get_cached_response(cache_key)
+            if entry is not None:
+                with self._ai_cache_lock:
+                    cache_put(self._ai_cache, cache_key, entry, PERPLEXITY_CACHE_SIZE)
+        if entry is not None:
+            cached = entry[1]
+            if stream:
+                print(cached)
+            return cached
         
         payload = {
             "model": PERPLEXITY_MODEL,
@@ -239,49 +672,137 @@ class DeliveryAnalyzer:
                 },
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": PERPLEXITY_MAX_TOKENS,
-            "temperature": PERPLEXITY_TEMPERATURE
+            "max_tokens": max_tokens,
+            "temperature": PERPLEXITY_TEMPERATURE,
+            "stream": stream
         }
         
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    PERPLEXITY_BASE_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                
+        if self._http is None:  # integration switched on after construction
+            with self._http_lock:
+                if self._http is None:
+                    self._http = self.create_http_session()
+        
+        try:
+            # Closing the response returns its connection to the pool, even if a stream stops early
+            with self._http.post(
+                PERPLEXITY_BASE_URL,
+                json=payload,
+                timeout=PERPLEXITY_STREAM_TIMEOUT if stream else PERPLEXITY_TIMEOUT,
+                stream=stream
+            ) as response:
                 if response.status_code == 200:
-                    return response.json()['choices'][0]['message']['content']
-                elif response.status_code == 429:
-                    # Rate limit - wait and retry
-                    print(f"⏳ Rate limit hit, waiting {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    print(f"⚠️ Perplexity API error {response.status_code}: {response.text}")
+                    if stream:
+                        content = self.read_streamed_response(response)
+                    else:
+                        content = response.json()['choices'][0]['message']['content']
+                    if content:
+                        created_at = self.store_cached_response(cache_key, content)
+                        with self._ai_cache_lock:
+                            cache_put(self._ai_cache, cache_key, (created_at, content), PERPLEXITY_CACHE_SIZE)
+                        return content
                     return None
-                    
-            except requests.RequestException as e:
-                print(f"⚠️ Perplexity API request failed (attempt {attempt+1}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+                
+                print(f"⚠️ Perplexity API error {response.status_code}: {response.text}")
+                return None
+                
+        except requests.RequestException as e:
+            print(f"⚠️ Perplexity API request failed: {e}")
                     
         print("❌ Perplexity API unavailable, falling back to rule-based processing")
         return None
     
+    def read_streamed_response(self, response):
+        """Echo the content deltas of a server-sent event stream and return the accumulated text"""
+        response.encoding = response.encoding or 'utf-8'
+        parts = []
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                break
+            try:
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+            except (json.JSONDecodeError, KeyError, IndexError, AttributeError):
+                continue
+            if delta:
+                parts.append(delta)
+                sys.stdout.write(delta)
+                sys.stdout.flush()
+        sys.stdout.write('\n')
+        return ''.join(parts)
+    
+    def perplexity_cache_key(self, prompt, max_tokens=PERPLEXITY_MAX_TOKENS):
+        """Hash the prompt together with the model settings that shape the response"""
+        key_source = f"{PERPLEXITY_MODEL}|{PERPLEXITY_TEMPERATURE}|{max_tokens}|{prompt}"
+        return hashlib.blake2b(key_source.encode(), digest_size=16).hexdigest()
+    
+    def open_response_cache(self):
+        """Open the SQLite response cache, creating its table on first use"""
+        conn = sqlite3.connect(PERPLEXITY_CACHE_FILE)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, content TEXT, created_at REAL, last_used REAL)"
+        )
+        return conn
+    
+    def get_cached_response(self, cache_key):
+        """Return (created_at, content) for a cached Perplexity response still within its TTL, or None"""
+        try:
+            with closing(self.open_response_cache()) as conn, conn:
+                row = conn.execute(
+                    "SELECT created_at, content FROM responses WHERE key = ? AND created_at > ?",
+                    (cache_key, time.time() - PERPLEXITY_CACHE_TTL)
+                ).fetchone()
+                if row:
+                    conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), cache_key))
+                    return row
+        except sqlite3.Error as e:
+            print(f"⚠️ Perplexity cache unavailable: {e}")
+        return None
+    
+    def store_cached_response(self, cache_key, content):
+        """Store a Perplexity response, dropping expired and least recently used entries; returns its timestamp"""
+        now = time.time()
+        try:
+            with closing(self.open_response_cache()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (cache_key, content, now, now)
+                )
+                conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - PERPLEXITY_CACHE_TTL,))
+                conn.execute(
+                    "DELETE FROM responses WHERE key NOT IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                    (PERPLEXITY_CACHE_SIZE,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to cache Perplexity response: {e}")
+        return now
+    
     def parse_natural_language_query(self, query):
         """Parse natural language query using Perplexity AI or fallback to rule-based"""
         
+        cache_key = query.strip().lower()
+        with self._cache_lock:
+            cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
         if self.use_perplexity:
             ai_result = self.parse_query_with_perplexity(query)
             if ai_result:
-                return ai_result
+                with self._cache_lock:
+                    cache_put(self._query_cache, cache_key, ai_result, QUERY_CACHE_SIZE)
+                return copy.deepcopy(ai_result)
+            # Don't cache the fallback, so a later call can still reach the API
+            return self.parse_query_rule_based(query)
         
         # Fallback to rule-based parsing
-        return self.parse_query_rule_based(query)
+        parsed = self.parse_query_rule_based(query)
+        with self._cache_lock:
+            cache_put(self._query_cache, cache_key, parsed, QUERY_CACHE_SIZE)
+        return copy.deepcopy(parsed)
     
     def parse_query_with_perplexity(self, query):
         """Use Perplexity AI for advanced natural language understanding"""
@@ -328,7 +849,7 @@ Example:
         if ai_response:
             try:
                 # Extract JSON from AI response
-                json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+                json_match = JSON_OBJECT_RE.search(ai_response)
                 if json_match:
                     parsed_data = json.loads(json_match.group())
                     
@@ -352,116 +873,148 @@ Example:
         """Original rule-based parsing method as fallback"""
         query = query.lower().strip()
         
-        # Extract time parameters
-        time_patterns = {
-            'yesterday': datetime.now() - timedelta(days=1),
-            'last week': datetime.now() - timedelta(weeks=1),
-            'last month': datetime.now() - timedelta(days=30),
-            'this month': datetime.now().replace(day=1),
-        }
-        
-        # Extract cities
-        cities = ['ahmedabad', 'mumbai', 'delhi', 'bangalore', 'chennai', 'pune', 'surat', 'coimbatore', 'mysuru', 'nagpur']
-        mentioned_cities = [city for city in cities if city in query]
+        # Extract cities and time references (reported in vocabulary order, without duplicates)
+        found_cities = set(CITY_RE.findall(query))
+        mentioned_cities = [city for city in KNOWN_CITIES if city in found_cities]
+        found_times = set(TIME_REFERENCE_RE.findall(query))
+        time_references = [ref for ref in TIME_REFERENCES if ref in found_times]
         
         # Extract clients (simplified)
-        client_pattern = r'client\s+([a-z]+)'
-        client_matches = re.findall(client_pattern, query)
+        client_matches = CLIENT_RE.findall(query)
         
         # Extract warehouse references
-        warehouse_pattern = r'warehouse\s+([a-z]+|\d+)'
-        warehouse_matches = re.findall(warehouse_pattern, query)
+        warehouse_matches = WAREHOUSE_RE.findall(query)
         
         # Determine intent
-        intent = 'unknown'
-        if any(word in query for word in ['why', 'explain', 'reasons', 'causes']):
-            intent = 'explain_causes'
-        elif any(word in query for word in ['compare', 'comparison']):
-            intent = 'compare'
-        elif any(word in query for word in ['predict', 'forecast', 'expect', 'prepare']):
-            intent = 'predict'
-        elif any(word in query for word in ['top', 'most', 'highest']):
-            intent = 'rank'
+        intent = next((name for pattern, name in INTENT_PATTERNS if pattern.search(query)), 'unknown')
         
         return {
             'intent': intent,
             'cities': mentioned_cities,
             'clients': client_matches,
             'warehouses': warehouse_matches,
-            'time_references': [k for k, v in time_patterns.items() if k in query],
+            'time_references': time_references,
             'original_query': query
         }
     
+    def clear_analysis_cache(self):
+        """Drop memoized analysis results and date masks (call whenever integrated_df changes)"""
+        with self._cache_lock:
+            self._analysis_cache.clear()
+            self._response_cache.clear()
+            self._date_masks.clear()
+    
+    def date_mask(self, date_from=None, date_to=None):
+        """Boolean order-date mask for a date range, computed once per range"""
+        key = (date_from, date_to)
+        with self._cache_lock:
+            mask = self._date_masks.get(key)
+        if mask is None:
+            order_date = self.integrated_df['order_date']
+            mask = np.ones(len(order_date), dtype=bool)
+            if date_from:
+                mask &= (order_date >= pd.to_datetime(date_from)).to_numpy()
+            if date_to:
+                mask &= (order_date <= pd.to_datetime(date_to)).to_numpy()
+            with self._cache_lock:
+                self._date_masks[key] = mask
+        return mask
+    
+    def run_analysis(self, filters, analysis, **kwargs):
+        """Filter the dataset and run an analysis method, memoized on the canonical filters"""
+        
+        # Filter lists are order-insensitive, so sort them into hashable tuples
+        canonical_filters = frozenset(
+            (key, tuple(sorted(value)) if isinstance(value, list) else value)
+            for key, value in filters.items()
+        )
+        cache_key = (canonical_filters, analysis, tuple(sorted(kwargs.items())))
+        
+        # Keep the entry itself: another thread may evict the key between lookup and use
+        with self._cache_lock:
+            entry = self._analysis_cache.get(cache_key)
+        if entry is None:
+            filtered_df = self.filter_data(filters)
+            entry = (len(filtered_df), getattr(self, analysis)(filtered_df, **kwargs))
+            with self._cache_lock:
+                cache_put(self._analysis_cache, cache_key, entry, ANALYSIS_CACHE_SIZE)
+        
+        record_count, results = entry
+        print(f"📊 Filtered dataset: {record_count} records")
+        return copy.deepcopy(results)
+    
     def filter_data(self, filters):
-        """Apply filters to the integrated dataset"""
-        df = self.integrated_df.copy()
+        """Apply filters to the integrated dataset with one combined mask and a single slice"""
+        df = self.integrated_df
+        mask = np.ones(len(df), dtype=bool)
         
         if 'cities' in filters and filters['cities']:
-            df = df[df['city'].str.lower().isin([c.lower() for c in filters['cities']])]
-        
-        if 'date_from' in filters and filters['date_from']:
-            df = df[df['order_date'] >= pd.to_datetime(filters['date_from'])]
+            mask &= isin_categories(df['city_lc'], [c.lower() for c in filters['cities']])
         
-        if 'date_to' in filters and filters['date_to']:
-            df = df[df['order_date'] <= pd.to_datetime(filters['date_to'])]
+        if filters.get('date_from') or filters.get('date_to'):
+            mask &= self.date_mask(filters.get('date_from'), filters.get('date_to'))
         
         if 'clients' in filters and filters['clients']:
-            df = df[df['client_name'].str.lower().str.contains('|'.join(filters['clients']), case=False, na=False)]
+            mask &= contains_categories(df['client_name'], '|'.join(filters['clients']))
         
         if 'warehouses' in filters and filters['warehouses']:
             warehouse_filter = '|'.join(filters['warehouses'])
-            df = df[df['warehouse_name'].str.lower().str.contains(warehouse_filter, case=False, na=False)]
+            mask &= contains_categories(df['warehouse_name'], warehouse_filter)
         
-        return df
+        # Unfiltered queries get the dataset itself; callers treat the result as read-only
+        return df if mask.all() else df.loc[mask]
     
-    def explain_delivery_causes(self, filtered_df, limit=10):
+    def explain_delivery_causes(self, filtered_df, limit=5):
         """Analyze and explain root causes of delivery issues"""
         
+        filtered_df = filtered_df[[col for col in CAUSE_ANALYSIS_COLUMNS if col in filtered_df.columns]]
+        
         # Focus on problematic deliveries
-        problem_df = filtered_df[
-            (filtered_df['is_delayed'] == True) | 
-            (filtered_df['status'].isin(['Failed', 'Returned']))
-        ]
+        problem_df = filtered_df[filtered_df['is_delayed'].to_numpy() | isin_categories(filtered_df['status'], ['Failed', 'Returned'])]
         
         if len(problem_df) == 0:
             return {"message": "No delivery issues found in the specified criteria"}
         
         # Root cause analysis
-        cause_analysis = problem_df.groupby('primary_root_cause').agg({
-            'order_id': 'count',
-            'delivery_delay_days': 'mean',
-            'amount': 'sum',
-            'rating': 'mean',
-            'severity': lambda x: (x == 'Critical').sum()
-        }).round(2)
-        
-        cause_analysis.columns = ['failure_count', 'avg_delay_days', 'lost_revenue', 'avg_rating', 'critical_cases']
-        cause_analysis = cause_analysis.sort_values('failure_count', ascending=False).head(limit)
-        
-        # Additional insights
+        cause_analysis = problem_df.groupby('primary_root_cause', observed=True).agg(
+            failure_count=('order_id', 'count'),
+            avg_delay_days=('delivery_delay_days', 'mean'),
+            lost_revenue=('amount', 'sum'),
+            avg_rating=('rating', 'mean'),
+            critical_cases=('is_critical', 'sum')
+        )
+        # Trim to the top causes before rounding; consumers only ever read the leading entries
+        cause_analysis = cause_analysis.sort_values('failure_count', ascending=False).head(limit).round(2)
+        
+        # Additional insights, summed per dimension from one grouping of the problem rows
+        # (dropna=False keeps rows whose other dimensions are missing in every margin)
+        dimensions = ['order_day_of_week', 'city']
+        if 'warehouse_name' in problem_df.columns:
+            dimensions.append('warehouse_name')
+        dimension_stats = problem_df.groupby(dimensions, observed=True, dropna=False).agg(
+            order_id=('order_id', 'count'),
+            amount=('amount', 'sum')
+        )
         insights = {}
         
         # Time-based patterns
-        time_patterns = problem_df.groupby(['order_day_of_week'])['order_id'].count().sort_values(ascending=False)
+        time_patterns = dimension_stats.groupby(level='order_day_of_week', observed=True)['order_id'].sum().sort_values(ascending=False)
         insights['worst_days'] = time_patterns.head(3).to_dict()
         
         # City-wise impact
-        city_impact = problem_df.groupby('city').agg({
-            'order_id': 'count',
-            'amount': 'sum'
-        }).sort_values('order_id', ascending=False).head(5)
+        city_impact = dimension_stats.groupby(level='city', observed=True).sum().sort_values('order_id', ascending=False).head(5)
         insights['most_affected_cities'] = city_impact.to_dict('index')
         
         # Warehouse performance
         if 'warehouse_name' in problem_df.columns:
-            warehouse_performance = problem_df.groupby('warehouse_name')['order_id'].count().sort_values(ascending=False).head(5)
+            warehouse_performance = dimension_stats.groupby(level='warehouse_name', observed=True)['order_id'].sum().sort_values(ascending=False).head(5)
             insights['problematic_warehouses'] = warehouse_performance.to_dict()
         
         return {
             'root_cause_analysis': cause_analysis.to_dict('index'),
             'total_affected_orders': len(problem_df),
-            'total_lost_revenue': problem_df['amount'].sum(),
-            'average_delay': problem_df['delivery_delay_days'].mean(),
+            'total_lost_revenue': float(problem_df['amount'].sum()),
+            'average_delay': float(problem_df['delivery_delay_days'].mean()),
             'insights': insights
         }
     
@@ -471,9 +1024,9 @@ Example:
         if comparison_field not in filtered_df.columns:
             return {"error": f"Field '{comparison_field}' not found"}
         
-        comparison_stats = filtered_df.groupby(comparison_field).agg({
+        comparison_stats = filtered_df.groupby(comparison_field, observed=True).agg({
             'order_id': 'count',
-            'is_delayed': lambda x: (x == True).sum(),
+            'is_delayed': 'sum',
             'delivery_delay_days': 'mean',
             'amount': 'sum',
             'rating': 'mean'
@@ -498,12 +1051,22 @@ Example:
     def generate_ai_recommendations(self, analysis_results):
         """Use Perplexity AI to generate contextual recommendations"""
         
+        # Reuse the combined AI call made by process_query for these results
+        bundle = self._ai_bundles.get(id(analysis_results))
+        if bundle and bundle['results'] is analysis_results and bundle.get('recommendations'):
+            return {
+                'source': 'perplexity_ai',
+                'recommendations': bundle['recommendations'],
+                'confidence': 'high',
+                'generated_at': datetime.now().isoformat()
+            }
+        
         # Prepare context for AI
         context = {
             'total_failures': analysis_results.get('total_affected_orders', 0),
             'revenue_impact': analysis_results.get('total_lost_revenue', 0),
             'top_causes': list(analysis_results.get('root_cause_analysis', {}).keys())[:5],
-            'affected_cities': list(analysis_results.get('insights', {}).get('city_impact', {}).keys())[:5]
+            'affected_cities': list(analysis_results.get('insights', {}).get('most_affected_cities', {}).keys())[:5]
         }
         
         prompt = f'''Based on this delivery analytics data, provide 5-7 specific, actionable recommendations:
@@ -514,7 +1077,7 @@ Context:
 - Top Root Causes: {context['top_causes']}
 - Most Affected Cities: {context['affected_cities']}
 
-Analysis Data (first 1500 chars): {str(analysis_results)[:1500]}
+Analysis Data (JSON): {self.prompt_context(analysis_results)}
 
 Provide recommendations in this structure:
 **IMMEDIATE ACTIONS (0-30 days):**
@@ -543,6 +1106,28 @@ Focus on operational changes, resource allocation, process improvements, and tec
         
         return None
     
+    def prompt_context(self, analysis_results, max_entries=5):
+        """Compact JSON summary of analysis results for AI prompts"""
+        
+        if 'root_cause_analysis' not in analysis_results:
+            # Comparison tables and messages are already flat; keep the leading entries
+            summary = dict(islice(analysis_results.items(), max_entries * 2))
+        else:
+            insights = analysis_results.get('insights', {})
+            summary = {
+                'totals': {
+                    'affected_orders': analysis_results.get('total_affected_orders'),
+                    'lost_revenue': analysis_results.get('total_lost_revenue'),
+                    'average_delay_days': analysis_results.get('average_delay')
+                },
+                'top_causes': dict(islice(analysis_results['root_cause_analysis'].items(), max_entries)),
+                'worst_days': insights.get('worst_days'),
+                'city_impact': insights.get('most_affected_cities'),
+                'problematic_warehouses': insights.get('problematic_warehouses')
+            }
+        
+        return json.dumps(summary, default=str)
+    
     def generate_rule_based_recommendations(self, analysis_results):
         """Original rule-based recommendation generation as fallback"""
         
@@ -612,12 +1197,18 @@ Focus on operational changes, resource allocation, process improvements, and tec
         if not self.use_perplexity:
             return "Executive summary generation requires Perplexity AI integration."
         
+        # Reuse the combined AI call made by process_query for these results
+        bundle = self._ai_bundles.get(id(analysis_results))
+        if (bundle and bundle['results'] is analysis_results and bundle['query'] == original_query
+                and bundle.get('executive_summary')):
+            return bundle['executive_summary']
+        
         prompt = f'''Create a concise executive summary for this delivery analytics report:
 
 Original Query: "{original_query}"
 
-Key Findings (first 1500 chars):
-{str(analysis_results)[:1500]}
+Key Findings (JSON):
+{self.prompt_context(analysis_results)}
 
 Generate a professional 3-paragraph executive summary covering:
 
@@ -632,8 +1223,92 @@ Top 3 priorities for improvement with expected outcomes
 
 Keep it executive-level (non-technical), action-oriented, and business-focused. Use specific numbers from the data.'''
         
-        summary = self.call_perplexity_api(prompt)
-        return summary if summary else "Unable to generate executive summary at this time."
+        if self.stream_summaries:
+            print(f"\n📋 EXECUTIVE SUMMARY (live)")
+            print(f"{'─'*50}")
+        summary = self.call_perplexity_api(prompt, stream=self.stream_summaries)
+        if not summary:
+            summary = "Unable to generate executive summary at this time."
+            if self.stream_summaries:
+                print(summary)
+        return summary
+    
+    def generate_ai_bundle(self, analysis_results, original_query):
+        """Fetch recommendations and executive summary with a single Perplexity call"""
+        
+        self._ai_bundles.pop(id(analysis_results), None)
+        
+        prompt = f'''Based on this delivery analytics report, produce both actionable recommendations and an executive summary.
+
+Original Query: "{original_query}"
+
+Key Findings (JSON):
+{self.prompt_context(analysis_results)}
+
+Return ONLY a valid JSON object with these string fields:
+- recommendations: 5-7 specific, actionable recommendations structured as
+  **IMMEDIATE ACTIONS (0-30 days):**, **SHORT-TERM IMPROVEMENTS (1-3 months):** and
+  **STRATEGIC INITIATIVES (3-6 months):** sections, each with bullet points
+- executive_summary: a professional 3-paragraph executive summary covering
+  **SITUATION OVERVIEW:**, **ROOT CAUSE ANALYSIS:** and **STRATEGIC RECOMMENDATIONS:**,
+  executive-level (non-technical), action-oriented, using specific numbers from the data
+
+Focus on operational changes, resource allocation, process improvements, and technology investments that directly address the root causes identified.'''
+        
+        ai_response = self.call_perplexity_api(prompt, max_tokens=PERPLEXITY_BUNDLE_MAX_TOKENS)
+        
+        if ai_response:
+            try:
+                json_match = JSON_OBJECT_RE.search(ai_response)
+                if json_match:
+                    # strict=False accepts the raw newlines models often leave inside string values
+                    bundle = json.loads(json_match.group(), strict=False)
+                    recommendations = bundle.get('recommendations')
+                    if isinstance(recommendations, dict):
+                        recommendations = '\n\n'.join(
+                            f"{heading}:\n" + '\n'.join(f"- {item}" for item in (items if isinstance(items, list) else [items]))
+                            for heading, items in recommendations.items()
+                        )
+                    elif isinstance(recommendations, list):
+                        recommendations = '\n'.join(str(r) for r in recommendations)
+                    self._ai_bundles[id(analysis_results)] = {
+                        'results': analysis_results,
+                        'query': original_query,
+                        'recommendations': recommendations,
+                        'executive_summary': bundle.get('executive_summary')
+                    }
+            except (json.JSONDecodeError, AttributeError) as e:
+                print(f"⚠️ Failed to parse Perplexity response: {e}")
+        
+        return self._ai_bundles.get(id(analysis_results))
+    
+    def process_query_cached(self, query):
+        """Answer a repeated query from the session response cache; a leading '!' forces a fresh run"""
+        refresh = query.startswith('!')
+        query = query.lstrip('!').strip()
+        # Relative timeframes ("yesterday", "last week") resolve per day, so the day is part of the key
+        cache_key = (query, datetime.now().strftime('%Y-%m-%d'))
+        
+        response = None
+        if not refresh:
+            with self._cache_lock:
+                # Move a hit to the end so eviction drops the least recently used response
+                response = self._response_cache.pop(cache_key, None)
+                if response is not None:
+                    self._response_cache[cache_key] = response
+        if response is not None:
+            print("⚡ Showing cached result (prefix the query with '!' to re-run it)")
+            # Every answered query is audited; nothing is streamed on a hit, so the report
+            # shows the summary in full
+            response = dict(response, timestamp=datetime.now().isoformat(), cached=True, summary_streamed=False)
+            self.save_audit_log(response)
+            return response
+        
+        response = self.process_query(query)
+        with self._cache_lock:
+            self._response_cache.pop(cache_key, None)
+            cache_put(self._response_cache, cache_key, response, RESPONSE_CACHE_SIZE)
+        return response
     
     def process_query(self, query):
         """Main method to process natural language queries with AI enhancement"""
@@ -664,40 +1339,54 @@ Keep it executive-level (non-technical), action-oriented, and business-focused.
             filters['warehouses'] = parsed['warehouses']
             print(f"🏭 Filtering by warehouses: {parsed['warehouses']}")
         
-        # Add time filters for recent queries
-        if 'yesterday' in query:
-            filters['date_from'] = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-            filters['date_to'] = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        elif 'last week' in query:
-            filters['date_from'] = (datetime.now() - timedelta(weeks=1)).strftime('%Y-%m-%d')
-        elif 'last month' in query:
-            filters['date_from'] = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        
-        # Get filtered data
-        filtered_df = self.filter_data(filters)
-        print(f"📊 Filtered dataset: {len(filtered_df)} records")
+        # Add time filters for recent queries (first matching timeframe wins)
+        timeframe = next((t for t in TIMEFRAMES if t in query), None)
+        if timeframe:
+            date_from, date_to = timeframe_bounds(timeframe)
+            filters['date_from'] = date_from
+            if date_to:
+                filters['date_to'] = date_to
         
-        # Execute analysis based on intent
+        # Filter and execute analysis based on intent (memoized per filter combination)
         if parsed['intent'] == 'explain_causes':
-            results = self.explain_delivery_causes(filtered_df)
+            results = self.run_analysis(filters, 'explain_delivery_causes')
         elif parsed['intent'] == 'compare':
             if parsed['cities'] and len(parsed['cities']) > 1:
-                results = self.compare_performance(filtered_df, 'city')
+                results = self.run_analysis(filters, 'compare_performance', comparison_field='city')
             else:
-                results = self.compare_performance(filtered_df, 'warehouse_name')
+                results = self.run_analysis(filters, 'compare_performance', comparison_field='warehouse_name')
         elif parsed['intent'] == 'rank':
-            results = self.explain_delivery_causes(filtered_df, limit=5)
+            results = self.run_analysis(filters, 'explain_delivery_causes', limit=5)
         else:
             # Default to root cause analysis
-            results = self.explain_delivery_causes(filtered_df)
+            results = self.run_analysis(filters, 'explain_delivery_causes')
         
-        # Generate AI-enhanced recommendations
-        recommendations = self.generate_recommendations(results)
+        # Fetch AI recommendations and executive summary in one call; the
+        # generators below reuse it and only call the API again if it failed.
+        # When streaming, the summary gets its own request so it can render as it arrives
+        if self.use_perplexity and not self.stream_summaries:
+            self.generate_ai_bundle(results, query)
         
-        # Generate executive summary (AI-enhanced)
+        # Generate AI-enhanced recommendations and executive summary; if the combined
+        # call failed, their separate fallback requests are independent and run concurrently.
+        # A streamed summary runs first on its own, so nothing prints into it while it is live
         executive_summary = None
-        if self.use_perplexity:
+        if self.use_perplexity and self.stream_summaries:
             executive_summary = self.generate_executive_summary(results, query)
+            recommendations = self.generate_recommendations(results)
+        elif self.use_perplexity:
+            # Workers run in copies of the caller's context, so context-local state such as a
+            # per-query output capture follows them
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                recommendations_future = executor.submit(
+                    contextvars.copy_context().run, self.generate_recommendations, results)
+                summary_future = executor.submit(
+                    contextvars.copy_context().run, self.generate_executive_summary, results, query)
+                recommendations = recommendations_future.result()
+                executive_summary = summary_future.result()
+            self._ai_bundles.pop(id(results), None)
+        else:
+            recommendations = self.generate_recommendations(results)
         
         # Create comprehensive response
         response = {
@@ -707,6 +1396,8 @@ Keep it executive-level (non-technical), action-oriented, and business-focused.
             'results': results,
             'recommendations': recommendations,
             'executive_summary': executive_summary,
+            # The summary was already rendered live, so display_results only points back to it
+            'summary_streamed': self.use_perplexity and self.stream_summaries,
             'ai_enhanced': self.use_perplexity,
             'parsing_confidence': parsed.get('confidence', 0.8),
             'timestamp': datetime.now().isoformat()
@@ -718,89 +1409,143 @@ Keep it executive-level (non-technical), action-oriented, and business-focused.
         return response
     
     def save_audit_log(self, response):
-        """Save analysis to audit log"""
-        audit_file = AUDIT_DIR / f"audit_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
-        with open(audit_file, 'w') as f:
-            json.dump(response, f, indent=2, default=str)
+        """Queue analysis for the audit log, writing once enough entries or time have accumulated"""
+        # The entry belongs to the day it was logged, even if it is flushed after midnight
+        entry = (datetime.now().strftime('%Y-%m-%d'), dumps_compact(response))
+        with self._audit_lock:
+            self._audit_buf.append(entry)
+            if (len(self._audit_buf) >= AUDIT_FLUSH_ENTRIES
+                    or time.monotonic() - self._audit_last_flush >= AUDIT_FLUSH_INTERVAL):
+                self.flush_audit_log()
+    
+    def flush_audit_log(self):
+        """Append buffered audit entries to the daily JSON Lines file(s)"""
+        with self._audit_lock:
+            for day, entries in groupby(self._audit_buf, key=itemgetter(0)):
+                audit_fh = self.audit_file_handle(day)
+                # Raw writes may be short; keep writing until the whole batch is on disk
+                pending = memoryview(('\n'.join(line for _, line in entries) + '\n').encode('utf-8'))
+                while pending:
+                    pending = pending[audit_fh.write(pending):]
+            self._audit_buf.clear()
+            self._audit_last_flush = time.monotonic()
+    
+    def audit_file_handle(self, day):
+        """Unbuffered append handle for a day's audit file, reopened when the day changes"""
+        if self._audit_day != day or self._audit_fh is None or self._audit_fh.closed:
+            if self._audit_fh is not None:
+                self._audit_fh.close()
+            self._audit_fh = open(AUDIT_DIR / f"audit_{day}.jsonl", 'ab', buffering=0)
+            self._audit_day = day
+        return self._audit_fh
     
     def display_results(self, response):
         """Display results in a human-readable format"""
         
-        print(f"\n{'='*80}")
-        print(f"📊 DELIVERY ANALYTICS REPORT")
-        print(f"{'='*80}")
+        # Render the whole report into memory and write it to stdout in one go
+        buf = io.StringIO()
+        emit = partial(print, file=buf)
+        
+        emit(f"\n{'='*80}")
+        emit(f"📊 DELIVERY ANALYTICS REPORT")
+        emit(f"{'='*80}")
         
-        print(f"\n🔍 Query: {response['query']}")
-        print(f"🕐 Analysis Time: {response['timestamp']}")
+        emit(f"\n🔍 Query: {response['query']}")
+        emit(f"🕐 Analysis Time: {response['timestamp']}")
         
         # Show AI enhancement status
         if response.get('ai_enhanced'):
-            print(f"🤖 AI-Enhanced Analysis (Confidence: {response.get('parsing_confidence', 0.8):.2f})")
+            emit(f"🤖 AI-Enhanced Analysis (Confidence: {response.get('parsing_confidence', 0.8):.2f})")
         else:
-            print(f"📋 Rule-based Analysis")
+            emit(f"📋 Rule-based Analysis")
         
         if response['filters_applied']:
-            print(f"\n🎯 Filters Applied:")
+            emit(f"\n🎯 Filters Applied:")
             for key, value in response['filters_applied'].items():
-                print(f"   • {key}: {value}")
+                emit(f"   • {key}: {value}")
         
         results = response['results']
         
         if 'root_cause_analysis' in results:
-            print(f"\n🎯 ROOT CAUSE ANALYSIS")
-            print(f"{'─'*50}")
+            emit(f"\n🎯 ROOT CAUSE ANALYSIS")
+            emit(f"{'─'*50}")
             
-            print(f"📈 Total Affected Orders: {results.get('total_affected_orders', 'N/A')}")
-            print(f"💰 Total Lost Revenue: ${results.get('total_lost_revenue', 0):,.2f}")
-            print(f"⏱️  Average Delay: {results.get('average_delay', 0):.1f} days")
+            emit(f"📈 Total Affected Orders: {results.get('total_affected_orders', 'N/A')}")
+            emit(f"💰 Total Lost Revenue: ${results.get('total_lost_revenue', 0):,.2f}")
+            emit(f"⏱️  Average Delay: {results.get('average_delay', 0):.1f} days")
             
-            print(f"\n🔍 Top Root Causes:")
-            for cause, data in list(results['root_cause_analysis'].items())[:5]:
-                print(f"   {cause}:")
-                print(f"      • Failure Count: {data['failure_count']}")
-                print(f"      • Avg Delay: {data['avg_delay_days']:.1f} days")
-                print(f"      • Lost Revenue: ${data['lost_revenue']:,.2f}")
-                print(f"      • Critical Cases: {data['critical_cases']}")
-                print()
+            emit(f"\n🔍 Top Root Causes:")
+            for cause, data in results['root_cause_analysis'].items():
+                emit(f"   {cause}:")
+                emit(f"      • Failure Count: {data['failure_count']}")
+                emit(f"      • Avg Delay: {data['avg_delay_days']:.1f} days")
+                emit(f"      • Lost Revenue: ${data['lost_revenue']:,.2f}")
+                emit(f"      • Critical Cases: {data['critical_cases']}")
+                emit()
         
         if 'insights' in results:
             insights = results['insights']
             
             if 'worst_days' in insights:
-                print(f"📅 Worst Performing Days:")
-                for day, count in list(insights['worst_days'].items())[:3]:
-                    print(f"   • {day}: {count} failures")
+                emit(f"📅 Worst Performing Days:")
+                for day, count in islice(insights['worst_days'].items(), 3):
+                    emit(f"   • {day}: {count} failures")
             
             if 'most_affected_cities' in insights:
-                print(f"\n🌍 Most Affected Cities:")
-                for city, data in list(insights['most_affected_cities'].items())[:3]:
-                    print(f"   • {city}: {data['order_id']} failures, ${data['amount']:,.2f} lost")
+                emit(f"\n🌍 Most Affected Cities:")
+                for city, data in islice(insights['most_affected_cities'].items(), 3):
+                    emit(f"   • {city}: {data['order_id']} failures, ${data['amount']:,.2f} lost")
         
         # Display executive summary (AI-enhanced)
-        if response.get('executive_summary'):
-            print(f"\n📋 EXECUTIVE SUMMARY")
-            print(f"{'─'*50}")
-            print(response['executive_summary'])
+        if response.get('executive_summary') and response.get('summary_streamed'):
+            emit(f"\n📋 Executive summary: shown above as it was generated")
+        elif response.get('executive_summary'):
+            emit(f"\n📋 EXECUTIVE SUMMARY")
+            emit(f"{'─'*50}")
+            emit(response['executive_summary'])
         
         # Display recommendations
         if response['recommendations']:
-            print(f"\n💡 ACTIONABLE RECOMMENDATIONS")
-            print(f"{'─'*50}")
+            emit(f"\n💡 ACTIONABLE RECOMMENDATIONS")
+            emit(f"{'─'*50}")
             
             if isinstance(response['recommendations'], dict) and response['recommendations'].get('source') == 'perplexity_ai':
                 # AI-generated recommendations
-                print("🤖 AI-Generated Recommendations:")
-                print(response['recommendations']['recommendations'])
+                emit("🤖 AI-Generated Recommendations:")
+                emit(response['recommendations']['recommendations'])
             else:
                 # Rule-based recommendations
                 for i, rec in enumerate(response['recommendations'][:8], 1):
-                    print(f"{i}. {rec}")
+                    emit(f"{i}. {rec}")
+        
+        emit(f"\n{'='*80}\n")
         
-        print(f"\n{'='*80}\n")
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
+
+@lru_cache(maxsize=1)
+def get_analyzer():
+    """Return the process-wide analyzer, loading the data on the first call only"""
+    return DeliveryAnalyzer()
+
+def setup_repl_history():
+    """Enable readline line editing with history persisted under the audit directory"""
+    try:
+        import readline
+    except ImportError:  # Not available on every platform; plain input() still works
+        return
+    try:
+        readline.read_history_file(REPL_HISTORY_FILE)
+    except (FileNotFoundError, OSError):
+        pass
+    readline.set_history_length(REPL_HISTORY_LENGTH)
+    atexit.register(readline.write_history_file, str(REPL_HISTORY_FILE))
 
 def main():
     """Main interactive loop"""
     
+    setup_repl_history()
+    
     print("🚚 Advanced Delivery Root Cause Analytics System")
     print("=" * 60)
     print("This system can help you understand delivery failures and delays.")
@@ -812,10 +1557,9 @@ def main():
     print("\nType 'help' for more examples, 'quit' to exit.")
     print("=" * 60)
     
+    # The analyzer (and the data stack it imports) is built on the first query, so help/quit stay instant
+    analyzer = None
     try:
-        # Initialize the analyzer
-        analyzer = DeliveryAnalyzer()
-        
         # Sample use cases for demonstration
         sample_queries = [
             "Why were deliveries delayed in Chennai yesterday?",
@@ -842,9 +1586,13 @@ def main():
                 print("4. Explain delivery issues for [client] in [timeframe]")
                 print("5. What warehouse problems occurred in [timeframe]?")
                 print("6. Why did orders fail during the festival period?")
+                print("\nRepeated queries are answered from cache; prefix a query with '!' to re-run it.")
                 continue
             
             elif query.lower() in ['samples', 'examples', 'demo']:
+                if analyzer is None:
+                    analyzer = get_analyzer()
+                    analyzer.stream_summaries = sys.stdout.isatty()
                 print("\n🎯 Running sample queries for demonstration:")
                 for i, sample_query in enumerate(sample_queries[:3], 1):
                     print(f"\n{'='*20} SAMPLE {i} {'='*20}")
@@ -855,12 +1603,16 @@ def main():
                         print(f"❌ Error processing sample query: {e}")
                 continue
             
-            elif not query:
+            elif not query.lstrip('!').strip():  # blank, or a bare '!' with nothing to re-run
                 continue
             
+            if analyzer is None:
+                analyzer = get_analyzer()
+                analyzer.stream_summaries = sys.stdout.isatty()
+            
             try:
                 # Process the query
-                response = analyzer.process_query(query)
+                response = analyzer.process_query_cached(query)
                 
                 # Display results
                 analyzer.display_results(response)
@@ -870,14 +1622,17 @@ def main():
                 print("Please try rephrasing your query or type 'help' for examples.")
                 
                 # Print detailed error for debugging
-                if os.getenv('DEBUG'):
+                if DEBUG:
                     traceback.print_exc()
     
     except KeyboardInterrupt:
+        if analyzer is not None:
+            analyzer.flush_audit_log()
         print("\n👋 Goodbye!")
     except Exception as e:
         print(f"❌ System error: {e}")
-        traceback.print_exc()
+        if DEBUG:
+            traceback.print_exc()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
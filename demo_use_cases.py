@@ -4,8 +4,40 @@ Demo script for the Delivery Root Cause Analytics System
 This script demonstrates all the sample use cases mentioned in the requirements.
 """
 
-from delivery_root_cause_analyzer import DeliveryAnalyzer
+import contextvars
+import io
+import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+class CapturedOutput:
+    """stdout proxy that sends prints made inside capture() to that call's own buffer"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        # A context variable rather than a thread-local, so threads the analyzer starts in a
+        # copy of the worker's context write to the same buffer
+        self._buffer = contextvars.ContextVar('buffer', default=None)
+    
+    def capture(self, func, *args):
+        """Run func with its output captured; return (result, error, output)"""
+        buffer = io.StringIO()
+        token = self._buffer.set(buffer)
+        try:
+            return func(*args), None, buffer.getvalue()
+        except Exception as e:
+            return None, e, buffer.getvalue()
+        finally:
+            self._buffer.reset(token)
+    
+    def write(self, text):
+        return (self._buffer.get() or self._stream).write(text)
+    
+    def flush(self):
+        self._stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
 
 def demo_sample_use_cases():
     """Demonstrate all the sample use cases"""
@@ -13,9 +45,10 @@ def demo_sample_use_cases():
     print("🚚 DELIVERY ANALYTICS SYSTEM - DEMO")
     print("=" * 80)
     
-    # Initialize analyzer
+    # Initialize analyzer (imported here so the data stack loads only when the demo runs)
     try:
-        analyzer = DeliveryAnalyzer()
+        from delivery_root_cause_analyzer import DEBUG, get_analyzer
+        analyzer = get_analyzer()
         print(f"✅ System initialized with {len(analyzer.integrated_df)} orders\n")
     except Exception as e:
         print(f"❌ Failed to initialize system: {e}")
@@ -34,19 +67,41 @@ def demo_sample_use_cases():
     print("🎯 DEMONSTRATING SAMPLE USE CASES")
     print("=" * 80)
     
-    for i, query in enumerate(sample_queries, 1):
-        print(f"\n{'='*20} USE CASE {i} {'='*20}")
-        print(f"Query: {query}")
-        print("-" * 60)
-        
-        try:
-            response = analyzer.process_query(query)
-            analyzer.display_results(response)
+    # With Perplexity enabled the API round trips dominate, so the queries run concurrently; each
+    # worker's progress output is captured and printed with its own report, in order. Rule-based
+    # runs are pandas-bound and stay sequential
+    executor = None
+    stdout = sys.stdout
+    if analyzer.use_perplexity:
+        output = CapturedOutput(stdout)
+        sys.stdout = output
+        executor = ThreadPoolExecutor(max_workers=4)
+        futures = [executor.submit(output.capture, analyzer.process_query, query) for query in sample_queries]
+    
+    try:
+        for i, query in enumerate(sample_queries, 1):
+            print(f"\n{'='*20} USE CASE {i} {'='*20}")
+            print(f"Query: {query}")
+            print("-" * 60)
             
-        except Exception as e:
-            print(f"❌ Error processing query: {e}")
-            if hasattr(e, '__traceback__'):
-                traceback.print_exc()
+            try:
+                if executor:
+                    response, error, captured = futures[i - 1].result()
+                    print(captured, end='')
+                    if error:
+                        raise error
+                else:
+                    response = analyzer.process_query(query)
+                analyzer.display_results(response)
+                
+            except Exception as e:
+                print(f"❌ Error processing query: {e}")
+                if DEBUG:
+                    traceback.print_exc()
+    finally:
+        if executor:
+            executor.shutdown()
+            sys.stdout = stdout
     
     print("\n" + "=" * 80)
     print("🎉 DEMO COMPLETED - All use cases demonstrated!")
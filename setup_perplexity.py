@@ -6,8 +6,12 @@ This script helps configure the Perplexity API key for enhanced AI features.
 """
 
 import os
+import re
 from pathlib import Path
 
+# The API key assignment in .env (first match is the one updated)
+API_KEY_LINE_RE = re.compile(r'^PERPLEXITY_API_KEY=.*$', re.MULTILINE)
+
 def setup_perplexity_api():
     """Interactive setup for Perplexity API configuration"""
     
@@ -19,16 +23,16 @@ def setup_perplexity_api():
     # Check if .env file exists
     env_file = Path('.env')
     
+    content = None
     if env_file.exists():
         print(f"\n✅ Found existing .env file")
-        with open(env_file, 'r') as f:
-            content = f.read()
-            if 'PERPLEXITY_API_KEY=' in content:
-                if 'your_perplexity_api_key_here' not in content:
-                    print("🔧 Perplexity API key appears to be already configured")
-                    choice = input("Would you like to update it? (y/N): ").strip().lower()
-                    if choice != 'y':
-                        return
+        content = env_file.read_text()
+        if 'PERPLEXITY_API_KEY=' in content:
+            if 'your_perplexity_api_key_here' not in content:
+                print("🔧 Perplexity API key appears to be already configured")
+                choice = input("Would you like to update it? (y/N): ").strip().lower()
+                if choice != 'y':
+                    return
     
     # Get API key from user
     print("\n📋 Please provide your Perplexity API key:")
@@ -42,25 +46,19 @@ def setup_perplexity_api():
     
     # Update .env file
     try:
-        if env_file.exists():
-            # Read existing content
-            with open(env_file, 'r') as f:
-                lines = f.readlines()
-            
-            # Update or add API key
-            updated = False
-            for i, line in enumerate(lines):
-                if line.startswith('PERPLEXITY_API_KEY='):
-                    lines[i] = f'PERPLEXITY_API_KEY={api_key}\n'
-                    updated = True
-                    break
-            
+        if content is not None:
+            # Update or add API key in the content read above
+            key_line = f'PERPLEXITY_API_KEY={api_key}'
+            content, updated = API_KEY_LINE_RE.subn(lambda _: key_line, content, count=1)
             if not updated:
-                lines.append(f'\nPERPLEXITY_API_KEY={api_key}\n')
+                content += f'\n{key_line}\n'
             
-            # Write back
-            with open(env_file, 'w') as f:
-                f.writelines(lines)
+            # Write a sibling temp file and rename it over .env, so an interrupted
+            # write never leaves a truncated file; keep the original permissions
+            tmp_file = env_file.with_name(env_file.name + '.tmp')
+            tmp_file.write_text(content)
+            os.chmod(tmp_file, env_file.stat().st_mode)
+            tmp_file.replace(env_file)
         else:
             print("❌ .env file not found. Please run from the project directory.")
             return